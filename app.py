@@ -1,10 +1,26 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, abort
-from werkzeug.security import generate_password_hash, check_password_hash
+import re
+import csv
+import io
+import hmac
+import sqlite3
+import threading
+from cachetools import TTLCache
+from jinja2 import FileSystemBytecodeCache
+from flask_compress import Compress
+from flask import Flask, render_template, request, redirect, url_for, flash, abort, Response, stream_with_context
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, case, func, select, update, event, text, inspect
+from sqlalchemy.exc import OperationalError, IntegrityError
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import selectinload, load_only, make_transient_to_detached
+from sqlalchemy.sql import table, column
 from extensions import db
-from my_models import User, Book, BookTransaction
+from my_models import User, Book, BookTransaction, SmallEnum
 from datetime import datetime, timedelta
 
 
@@ -14,26 +30,193 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_secret_key')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(BASE_DIR, 'library.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Keep pooled connections (and their prepared-statement caches) alive across requests.
+# QueuePool rather than StaticPool so concurrent requests never share one connection.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_pre_ping': False,
+    'query_cache_size': 1200,
+    'connect_args': {'check_same_thread': False, 'timeout': 5, 'cached_statements': 256},
+}
 app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=30)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500
+Compress(app)
+
+DEBUG_MODE = os.environ.get("FLASK_DEBUG", "False").lower() in ("1", "true", "yes")
+if not DEBUG_MODE:
+    # Cache compiled templates across worker restarts and skip the per-render mtime check
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.jinja_env.auto_reload = False
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
 db.init_app(app)
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _):
+    # WAL lets readers run alongside a writer; NORMAL sync is safe with WAL and fsyncs less
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-20000")
+    cur.close()
+
+
+BOOK_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(title, author, isbn, content='book', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, author, isbn) VALUES ('delete', old.id, old.title, old.author, old.isbn);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, author, isbn ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, title, author, isbn) VALUES ('delete', old.id, old.title, old.author, old.isbn);
+        INSERT INTO book_fts(rowid, title, author, isbn) VALUES (new.id, new.title, new.author, new.isbn);
+    END""",
+]
+
+
+def ensure_book_fts():
+    """Create the FTS5 search index over books if missing. Returns False when FTS5 is unavailable."""
+    try:
+        with db.engine.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'book_fts'")).first()
+            for ddl in BOOK_FTS_DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                # Index books that were added before the FTS table existed
+                conn.execute(text("INSERT INTO book_fts(book_fts) VALUES ('rebuild')"))
+    except OperationalError as e:
+        # Only a SQLite build without FTS5 falls back to ILIKE search; anything
+        # else (e.g. a locked database) is a real startup failure
+        if 'no such module: fts5' not in str(e.orig):
+            raise
+        app.logger.warning("SQLite has no FTS5 support; book search falls back to ILIKE")
+        return False
+    return True
+
+
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.init_app(app)
 with app.app_context():
     db.create_all()
+    # create_all() skips tables that already exist, so add any missing indexes explicitly.
+    # Checked by name because reflection doesn't report expression indexes.
+    with db.engine.begin() as conn:
+        existing_indexes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        for model_table in db.metadata.sorted_tables:
+            for index in model_table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique:
+                    # Legacy rows may clash (e.g. emails differing only by case); say so plainly
+                    # instead of failing with a bare IntegrityError
+                    duplicates = conn.execute(
+                        select(*index.expressions).group_by(*index.expressions).having(func.count() > 1).limit(5)
+                    ).all()
+                    if duplicates:
+                        raise RuntimeError(
+                            f"Cannot create unique index {index.name} on {model_table.name}: "
+                            f"duplicate values {[tuple(row) for row in duplicates]}. "
+                            "Resolve these rows and restart."
+                        )
+                index.create(conn)
+        # Convert enum columns still holding strings from before they were stored as codes
+        for model_table in db.metadata.sorted_tables:
+            for col in model_table.columns:
+                if not isinstance(col.type, SmallEnum):
+                    continue
+                # Cheap probe first so already-converted tables skip the per-value UPDATEs
+                has_strings = conn.execute(text(
+                    f"SELECT 1 FROM {model_table.name} "
+                    f"WHERE typeof({col.name}) = 'text' AND {col.name} NOT GLOB '[0-9]*' LIMIT 1"
+                )).first()
+                if has_strings:
+                    for code, name in enumerate(col.type.choices, start=1):
+                        conn.execute(
+                            text(f"UPDATE {model_table.name} SET {col.name} = :code WHERE {col.name} = :name"),
+                            {'code': code, 'name': name}
+                        )
+    BOOK_FTS_ENABLED = ensure_book_fts()
 
 
 
 DUE_DAYS = 14
 FINE_PER_DAY = 5.0  
+RECENT_HISTORY_LIMIT = 20
+REPORT_PAGE_SIZE = 50
+REPORT_MAX_PAGE_SIZE = 200
+
+# New hashes use argon2id; older Werkzeug pbkdf2 hashes are still accepted and
+# upgraded on the next successful login.
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def check_password(password_hash, password):
+    if not password_hash.startswith('$argon2'):
+        return check_password_hash(password_hash, password)
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(password_hash):
+    return not password_hash.startswith('$argon2') or password_hasher.check_needs_rehash(password_hash)
+
+# Recent password checks, so repeat logins skip the slow KDF. The key holds an HMAC
+# of the password (never the cleartext) and the stored hash, so a password change
+# naturally misses the cache.
+_pw_cache = TTLCache(maxsize=1024, ttl=300)
+_pw_cache_lock = threading.Lock()
+
+def verify_password(user, password):
+    digest = hmac.new(app.config['SECRET_KEY'].encode(), password.encode(), 'sha256').digest()
+    key = (user.id, user.password_hash, digest)
+    with _pw_cache_lock:
+        ok = _pw_cache.get(key)
+    if ok is None:
+        ok = check_password(user.password_hash, password)
+        with _pw_cache_lock:
+            _pw_cache[key] = ok
+    return ok
+
+# Column values of recently loaded users, so most requests skip the user_loader SELECT.
+# Entries are dropped on logout and whenever the account is changed.
+_user_cache = TTLCache(maxsize=1024, ttl=60)
+_user_cache_lock = threading.Lock()
+
+def forget_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.query.get(int(user_id))
+        user_id = int(user_id)
     except (ValueError, TypeError):
         return None
+    with _user_cache_lock:
+        data = _user_cache.get(user_id)
+    if data is not None:
+        # Rebuild the row and attach it to this request's session without a SELECT
+        user = User(**data)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    user = User.query.get(user_id)
+    if user is not None:
+        data = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with _user_cache_lock:
+            _user_cache[user_id] = data
+    return user
 
 
 @app.route('/')
@@ -57,13 +240,13 @@ def login():
             flash("Username and password are required.", "danger")
             return render_template('login.html')
         
-        # Find user by username; if not found, try by email (allow login via either)
-        user = User.query.filter_by(username=username).first()
-        if not user:
-            user = User.query.filter_by(email=username.lower()).first()
+        # Find user by username or email in one query, preferring a username match
+        user = User.query.filter(
+            or_(User.username == username, func.lower(User.email) == username.lower())
+        ).order_by(case((User.username == username, 0), else_=1)).first()
         
         
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not verify_password(user, password):
             flash("Invalid credentials. Please check your username and password.", "danger")
             return render_template('login.html')
         
@@ -72,6 +255,11 @@ def login():
             flash("Account inactive. Contact admin.", "warning")
             return redirect(url_for('login'))
         
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.session.commit()
+            forget_user(user.id)
+        
         # All checks passed, login the user
         login_user(user, remember=remember_me)
         flash("Logged in successfully.", "success")
@@ -91,6 +279,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    forget_user(current_user.id)
     logout_user()
     flash("Logged out.", "info")
     return redirect(url_for('login'))
@@ -108,20 +297,11 @@ def register():
             flash("Username, password, and email are required.", "danger")
             return redirect(url_for('register'))
         
-        # Check if username already exists
-        if User.query.filter_by(username=username).first():
-            flash(f"Username '{username}' is already taken. Please choose a different username.", "danger")
-            return redirect(url_for('register'))
-        
-        # Check if email already exists
-        if User.query.filter_by(email=email).first():
-            flash(f"Email '{email}' is already registered. Please use a different email or login instead.", "danger")
-            return redirect(url_for('register'))
-        
-        # Create new user with username and email stored in database
+        # Create new user with username and email stored in database.
+        # Uniqueness is enforced by the UNIQUE indexes on insert rather than pre-checked.
         user = User(
             username=username,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             name=name,
             email=email,
             role='user',
@@ -141,18 +321,21 @@ def register():
             except Exception:
                 pass
             return resp
-        except Exception as e:
+        except IntegrityError as e:
             db.session.rollback()
-            # Handle database unique constraint violations as backup
-            if 'UNIQUE constraint failed' in str(e) or 'unique constraint' in str(e).lower():
-                if 'username' in str(e).lower():
-                    flash(f"Username '{username}' is already taken. Please choose a different username.", "danger")
-                elif 'email' in str(e).lower():
-                    flash(f"Email '{email}' is already registered. Please use a different email.", "danger")
-                else:
-                    flash("Username or email already exists. Please choose different credentials.", "danger")
+            # Work out which constraint failed from the driver message (the full
+            # exception text also contains the INSERT, which names every column)
+            message = str(e.orig).lower()
+            if 'username' in message:
+                flash(f"Username '{username}' is already taken. Please choose a different username.", "danger")
+            elif 'email' in message:
+                flash(f"Email '{email}' is already registered. Please use a different email or login instead.", "danger")
             else:
-                flash("An error occurred during registration. Please try again.", "danger")
+                flash("Username or email already exists. Please choose different credentials.", "danger")
+            return redirect(url_for('register'))
+        except Exception:
+            db.session.rollback()
+            flash("An error occurred during registration. Please try again.", "danger")
             return redirect(url_for('register'))
     
     return render_template('register.html')
@@ -171,16 +354,18 @@ def admin_required(func):
 @login_required
 @admin_required
 def admin_dashboard():
-    total_books = Book.query.count()
-    total_users = User.query.filter_by(role='user').count()
-    issued = BookTransaction.query.filter_by(status='issued').count()
-    overdue = 0
-    now = datetime.utcnow()
-    for t in BookTransaction.query.filter_by(status='issued').all():
-        if t.due_date and t.due_date < now:
-            overdue += 1
-    recent_transactions = BookTransaction.query.order_by(BookTransaction.issue_date.desc()).limit(8).all()
-    return render_template('admin_dashboard.html', total_books=total_books, total_users=total_users, issued=issued, overdue=overdue, recent_transactions=recent_transactions)
+    now = func.current_timestamp()
+    # Fold all dashboard counters into a single round trip
+    stats = db.session.execute(select(
+        select(func.count()).select_from(Book).scalar_subquery().label('total_books'),
+        select(func.count()).select_from(User).where(User.role == 'user').scalar_subquery().label('total_users'),
+        select(func.count()).select_from(BookTransaction).where(BookTransaction.status == 'issued').scalar_subquery().label('issued'),
+        select(func.count()).select_from(BookTransaction).where(
+            and_(BookTransaction.status == 'issued', BookTransaction.due_date < now)
+        ).scalar_subquery().label('overdue'),
+    )).one()
+    recent_transactions = BookTransaction.query.options(selectinload(BookTransaction.book), selectinload(BookTransaction.user)).order_by(BookTransaction.issue_date.desc(), BookTransaction.id.desc()).limit(8).all()
+    return render_template('admin_dashboard.html', total_books=stats.total_books, total_users=stats.total_users, issued=stats.issued, overdue=stats.overdue, recent_transactions=recent_transactions)
 
 # ------------------------- User Dashboard -------------------------
 @app.route('/user')
@@ -188,41 +373,65 @@ def admin_dashboard():
 def user_dashboard():
     if current_user.role == 'admin':
         return redirect(url_for('admin_dashboard'))
-    my_BookTransactions = BookTransaction.query.filter_by(user_id=current_user.id).order_by(BookTransaction.issue_date.desc()).all()
     today = datetime.utcnow().date()
+    # Overdue means due before today (UTC); date() compares against 'YYYY-MM-DD' in SQLite
+    start_of_today = func.date(func.current_timestamp())
     
-    # Calculate statistics
-    issued_books = [t for t in my_BookTransactions if t.status == 'issued']
-    overdue_books = [t for t in issued_books if t.due_date and t.due_date.date() < today]
-    returned_books = [t for t in my_BookTransactions if t.status == 'returned']
-    total_fine = sum(t.fine for t in my_BookTransactions if t.fine > 0)
+    # Calculate statistics in SQL instead of hydrating the user's whole history
+    issued = BookTransaction.status == 'issued'
+    stats = db.session.execute(select(
+        func.count().label('total'),
+        func.coalesce(func.sum(case((issued, 1), else_=0)), 0).label('issued'),
+        func.coalesce(func.sum(case((and_(issued, BookTransaction.due_date < start_of_today), 1), else_=0)), 0).label('overdue'),
+        func.coalesce(func.sum(case((BookTransaction.status == 'returned', 1), else_=0)), 0).label('returned'),
+        func.coalesce(func.sum(case((BookTransaction.fine > 0, BookTransaction.fine), else_=0)), 0).label('fine'),
+    ).where(BookTransaction.user_id == current_user.id)).one()
     
     # Library statistics
-    total_books_in_library = Book.query.count()
-    available_books = Book.query.filter(Book.available_copies > 0).count()
+    library = db.session.execute(select(
+        func.count().label('total'),
+        # Separate subquery so SQLite can answer it from the partial index
+        select(func.count()).select_from(Book).where(Book.available_copies > 0).scalar_subquery().label('available'),
+    ).select_from(Book)).one()
     
-    has_issued = len(issued_books) > 0
+    # Only load what the page renders: every book still out, plus the recent history
+    issued_BookTransactions = BookTransaction.query.options(selectinload(BookTransaction.book)).filter_by(user_id=current_user.id, status='issued').order_by(BookTransaction.issue_date.desc(), BookTransaction.id.desc()).all()
+    my_BookTransactions = BookTransaction.query.options(selectinload(BookTransaction.book)).filter_by(user_id=current_user.id).order_by(BookTransaction.issue_date.desc(), BookTransaction.id.desc()).limit(RECENT_HISTORY_LIMIT).all()
     
     return render_template('user_dashboard.html', 
                          my_BookTransactions=my_BookTransactions, 
+                         issued_BookTransactions=issued_BookTransactions,
+                         total_transactions=stats.total,
                          fine_per_day=FINE_PER_DAY, 
                          today=today, 
-                         has_issued=has_issued,
-                         issued_count=len(issued_books),
-                         overdue_count=len(overdue_books),
-                         returned_count=len(returned_books),
-                         total_fine=total_fine,
-                         total_books_in_library=total_books_in_library,
-                         available_books=available_books,
+                         has_issued=stats.issued > 0,
+                         issued_count=stats.issued,
+                         overdue_count=stats.overdue,
+                         returned_count=stats.returned,
+                         total_fine=stats.fine,
+                         total_books_in_library=library.total,
+                         available_books=library.available,
                          DUE_DAYS=DUE_DAYS)
 
 # ------------------------- Books -------------------------
+book_fts = table('book_fts', column('rowid'), column('rank'))
+# Columns rendered by the book listing; publisher/status are left unloaded
+book_list_columns = load_only(Book.id, Book.title, Book.author, Book.isbn, Book.category, Book.total_copies, Book.available_copies)
+
 @app.route('/books')
 @login_required
 def books():
     q = request.args.get('q', '').strip()
-    if q:
-        books = Book.query.filter(
+    if q and BOOK_FTS_ENABLED:
+        # Quote each word and prefix-match it so user input can't break the MATCH syntax
+        terms = ' '.join(f'"{w}"*' for w in re.findall(r'\w+', q))
+        books = []
+        if terms:
+            books = Book.query.options(book_list_columns).join(
+                book_fts, book_fts.c.rowid == Book.id
+            ).filter(text("book_fts MATCH :q")).params(q=terms).order_by(book_fts.c.rank).all()
+    elif q:
+        books = Book.query.options(book_list_columns).filter(
             or_(
                 Book.title.ilike(f'%{q}%'),
                 Book.author.ilike(f'%{q}%'),
@@ -230,7 +439,7 @@ def books():
             )
         ).all()
     else:
-        books = Book.query.order_by(Book.title).all()
+        books = Book.query.options(book_list_columns).order_by(Book.title).all()
     return render_template('books.html', books=books, q=q, due_days=DUE_DAYS, fine_per_day=FINE_PER_DAY)
 
 @app.route('/admin/book/add', methods=['GET','POST'])
@@ -315,6 +524,23 @@ def delete_book(book_id):
     return redirect(url_for('books'))
 
 # ------------------------- Issue & Return -------------------------
+def reserve_copy(book_id):
+    """Atomically take one available copy; returns False if none were left."""
+    result = db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.available_copies > 0)
+        .values(available_copies=Book.available_copies - 1)
+    )
+    return result.rowcount > 0
+
+def release_copy(book_id):
+    """Atomically put one copy back, never exceeding the total."""
+    db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.available_copies < Book.total_copies)
+        .values(available_copies=Book.available_copies + 1)
+    )
+
 @app.route('/books/issue/<int:book_id>', methods=['GET','POST'])
 @login_required
 def issue_book_to_user(book_id):
@@ -322,10 +548,6 @@ def issue_book_to_user(book_id):
     book = Book.query.get_or_404(book_id)
     
     if request.method == 'POST':
-        if book.available_copies <= 0:
-            flash("No copies available.", "warning")
-            return redirect(url_for('books'))
-        
         # Check if user already has this book issued
         existing = BookTransaction.query.filter_by(
             user_id=current_user.id, 
@@ -336,9 +558,12 @@ def issue_book_to_user(book_id):
             flash("You already have this book issued.", "warning")
             return redirect(url_for('books'))
         
+        if not reserve_copy(book.id):
+            flash("No copies available.", "warning")
+            return redirect(url_for('books'))
+        
         due_date = datetime.utcnow() + timedelta(days=DUE_DAYS)
         tr = BookTransaction(user_id=current_user.id, book_id=book.id, due_date=due_date, status='issued')
-        book.available_copies -= 1
         db.session.add(tr)
         db.session.commit()
         
@@ -377,22 +602,23 @@ def issue_book():
             return redirect(url_for('issue_book'))
         
         user = User.query.get(user_id)
-        book = Book.query.get(book_id)
-        if not user or not book:
+        if not user:
             flash("Invalid user or book.", "danger")
             return redirect(url_for('issue_book'))
-        if book.available_copies <= 0:
-            flash("No copies available.", "warning")
+        if not reserve_copy(book_id):
+            if Book.query.get(book_id) is None:
+                flash("Invalid user or book.", "danger")
+            else:
+                flash("No copies available.", "warning")
             return redirect(url_for('issue_book'))
         due_date = datetime.utcnow() + timedelta(days=DUE_DAYS)
-        tr = BookTransaction(user_id=user.id, book_id=book.id, due_date=due_date, status='issued')
-        book.available_copies -= 1
+        tr = BookTransaction(user_id=user.id, book_id=book_id, due_date=due_date, status='issued')
         db.session.add(tr)
         db.session.commit()
         flash(f"Book issued to {user.username}. Due on {due_date.date()}", "success")
         return redirect(url_for('admin_dashboard'))
-    users = User.query.filter_by(role='user').all()
-    books = Book.query.filter(Book.available_copies > 0).all()
+    users = User.query.options(load_only(User.id, User.username, User.name)).filter_by(role='user').all()
+    books = Book.query.options(load_only(Book.id, Book.title, Book.available_copies)).filter(Book.available_copies > 0).all()
     return render_template('issue_book.html', users=users, books=books, due_days=DUE_DAYS)
 
 @app.route('/return/<int:trans_id>', methods=['GET','POST'])
@@ -412,7 +638,7 @@ def return_book(trans_id):
             tr.fine = 0.0
         tr.status = 'returned'
         # increment available copies
-        tr.book.available_copies = min(tr.book.total_copies, tr.book.available_copies + 1)
+        release_copy(tr.book_id)
         db.session.commit()
         flash("Book returned successfully.", "success")
         if current_user.role == 'admin':
@@ -426,16 +652,40 @@ def return_book(trans_id):
 @login_required
 @admin_required
 def report():
-    # Simple report: all BookTransactions
-    BookTransactions = BookTransaction.query.order_by(BookTransaction.issue_date.desc()).all()
-    return render_template('report.html', BookTransactions=BookTransactions)
+    # Paginated report of all BookTransactions, newest first
+    page = max(request.args.get('page', 1, type=int), 1)
+    size = min(max(request.args.get('size', REPORT_PAGE_SIZE, type=int), 1), REPORT_MAX_PAGE_SIZE)
+    # Fetch one extra row to know whether there is a next page without a COUNT(*)
+    rows = BookTransaction.query.options(selectinload(BookTransaction.book), selectinload(BookTransaction.user)).order_by(BookTransaction.id.desc()).limit(size + 1).offset((page - 1) * size).all()
+    return render_template('report.html', transactions=rows[:size], page=page, size=size, has_next=len(rows) > size)
+
+@app.route('/admin/report.csv')
+@login_required
+@admin_required
+def report_csv():
+    stmt = select(BookTransaction).options(selectinload(BookTransaction.book), selectinload(BookTransaction.user)).order_by(BookTransaction.id.desc())
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(['id', 'user', 'book', 'issue_date', 'due_date', 'return_date', 'fine', 'status'])
+        # yield_per keeps only one batch of rows in memory at a time
+        for tr in db.session.execute(stmt.execution_options(yield_per=500)).scalars():
+            writer.writerow([tr.id, tr.user.username, tr.book.title, tr.issue_date, tr.due_date, tr.return_date, tr.fine, tr.status])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=transactions.csv'})
 
 # ------------------------- Admin user management -------------------------
 @app.route('/admin/users')
 @login_required
 @admin_required
 def manage_users():
-    users = User.query.order_by(User.username).all()
+    users = User.query.options(load_only(User.id, User.username, User.email, User.role, User.active, User.name)).order_by(User.username).all()
     return render_template('manage_users.html', users=users)
 
 @app.route('/admin/user/toggle/<int:user_id>', methods=['POST'])
@@ -448,6 +698,7 @@ def toggle_user(user_id):
         return redirect(url_for('manage_users'))
     user.active = not user.active
     db.session.commit()
+    forget_user(user.id)
     flash("User status updated.", "info")
     return redirect(url_for('manage_users'))
 
@@ -467,6 +718,5 @@ if __name__ == "__main__":
     # Use PORT env var when deployed (platforms like Render/Heroku set this).
     port = int(os.environ.get("PORT", 5000))
     # Use host 0.0.0.0 so the container accepts external connections.
-    debug_mode = os.environ.get("FLASK_DEBUG", "False").lower() in ("1", "true", "yes")
-    app.run(host="0.0.0.0", port=port, debug=debug_mode)
+    app.run(host="0.0.0.0", port=port, debug=DEBUG_MODE)
 
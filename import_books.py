@@ -4,6 +4,7 @@ from my_models import Book
 
 
 CSV_FILE = 'book.py.csv'
+BATCH_SIZE = 1000
 
 with app.app_context():
     with open(CSV_FILE, 'r', encoding='utf-8') as file:
@@ -11,6 +12,14 @@ with app.app_context():
 
         count = 0
         skipped = 0
+        batch = []
+
+        # Take the write lock up front so the duplicate check and inserts run in one
+        # IMMEDIATE transaction and never have to upgrade from a read lock
+        db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+
+        # Load existing (title, author) pairs once instead of querying per row
+        existing = {(t, a) for (t, a) in db.session.query(Book.title, Book.author)}
         
         for row in reader:
             # Read CSV columns: bid, title, author, category, status
@@ -24,11 +33,11 @@ with app.app_context():
                 skipped += 1
                 continue
             
-            # Check if book already exists (by title and author)
-            existing = Book.query.filter_by(title=title, author=author).first()
-            if existing:
+            # Check if book already exists (by title and author), including earlier CSV rows
+            if (title, author) in existing:
                 skipped += 1
                 continue
+            existing.add((title, author))
             
             # Set copies based on status
             # If status is 'issued', set available_copies to 0 (book is out)
@@ -47,18 +56,23 @@ with app.app_context():
             # Map status to model format
             book_status = 'Available' if status == 'available' else 'Issued'
             
-            book = Book(
+            batch.append(dict(
                 title=title,
                 author=author,
                 category=category if category else None,
                 total_copies=total_copies,
                 available_copies=available_copies,
                 status=book_status
-            )
-            
-            db.session.add(book)
+            ))
             count += 1
 
+            if len(batch) >= BATCH_SIZE:
+                db.session.bulk_insert_mappings(Book, batch)
+                batch = []
+
+        if batch:
+            db.session.bulk_insert_mappings(Book, batch)
+        # Single commit for the whole import
         db.session.commit()
         print(f"✅ Successfully imported {count} books into the database.")
         if skipped > 0:
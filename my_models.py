@@ -1,8 +1,36 @@
 from flask_login import UserMixin
-from datetime import datetime
+from sqlalchemy import func, types
 from extensions import db
 
 
+class SmallEnum(types.TypeDecorator):
+    """Stores one of a fixed set of strings as a small integer code (1, 2, ...)."""
+    impl = types.SmallInteger
+    cache_ok = True
+
+    def __init__(self, choices):
+        super().__init__()
+        self.choices = tuple(choices)
+        self._codes = {name: code for code, name in enumerate(self.choices, start=1)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of {self.choices}")
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self.choices[int(value) - 1]
+        except (ValueError, IndexError):
+            # Legacy row still holding the string itself
+            return value
+
+
 class User(UserMixin, db.Model):
     __tablename__ = "users"
     id = db.Column(db.Integer, primary_key=True)
@@ -10,12 +38,16 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(120))
     email = db.Column(db.String(120), unique=True, nullable=False)
-    role = db.Column(db.String(20), default="user")  # "admin" or "user"
+    role = db.Column(SmallEnum(("user", "admin")), default="user")
     active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=func.current_timestamp(), server_default=func.current_timestamp())
 
     transactions = db.relationship("BookTransaction", back_populates="user")
 
+    __table_args__ = (
+        db.Index('ix_users_email_lower', func.lower(email), unique=True),
+    )
+
 
 class Book(db.Model):
     __tablename__ = "book"
@@ -27,21 +59,34 @@ class Book(db.Model):
     category = db.Column(db.String(50))
     total_copies = db.Column(db.Integer, default=1)
     available_copies = db.Column(db.Integer, default=1)
-    status = db.Column(db.String(20), default='Available')
+    status = db.Column(SmallEnum(('Available', 'Issued')), default='Available')
 
     transactions = db.relationship("BookTransaction", back_populates="book")
 
+    __table_args__ = (
+        # Lets "available books" queries scan only books with copies left
+        db.Index('ix_books_available_partial', 'id', sqlite_where=db.text('available_copies > 0')),
+    )
+
 
 class BookTransaction(db.Model):
     __tablename__ = 'transactions'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     book_id = db.Column(db.Integer, db.ForeignKey("book.id"), nullable=False)
-    issue_date = db.Column(db.DateTime, default=datetime.utcnow)
+    # Timestamp is filled in by SQLite inside the INSERT (default= covers tables created without the server default)
+    issue_date = db.Column(db.DateTime, default=func.current_timestamp(), server_default=func.current_timestamp())
     due_date = db.Column(db.DateTime)
     return_date = db.Column(db.DateTime, nullable=True)
     fine = db.Column(db.Float, default=0.0)
-    status = db.Column(db.String(30), default="issued")  # issued/returned/overdue
+    status = db.Column(SmallEnum(("issued", "returned", "overdue")), default="issued")
 
     user = db.relationship("User", back_populates="transactions")
     book = db.relationship("Book", back_populates="transactions")
+
+    __table_args__ = (
+        db.Index('ix_tx_user_status', 'user_id', 'status'),
+        db.Index('ix_tx_book_status', 'book_id', 'status'),
+        db.Index('ix_tx_status_due', 'status', 'due_date'),
+        db.Index('ix_tx_issue_date', issue_date.desc()),
+    )